@@ -7,24 +7,33 @@
 - 기존 "Google Drive 업로드(서비스 계정, XLSX)" 기능은 유지
 
 패키지(로컬 PowerShell)
-  & "C:\\Users\\customer\\AppData\\Local\\Programs\\Python\\Python313\\python.exe" -m pip install streamlit pandas openpyxl gspread gspread-dataframe google-auth-oauthlib google-auth google-auth-httplib2
+  & "C:\\Users\\customer\\AppData\\Local\\Programs\\Python\\Python313\\python.exe" -m pip install streamlit pandas openpyxl xlsxwriter orjson gspread google-auth-oauthlib google-auth google-auth-httplib2
 실행
   & "C:\\Users\\customer\\AppData\\Local\\Programs\\Python\\Python313\\python.exe" -m streamlit run "C:\\tsct\\s18.py"
 """
 from __future__ import annotations
 
-import io
+import atexit
+import hashlib
 import json
 import re
 import sys
+import tempfile
 import uuid
-import os
 import pickle
 from datetime import date, datetime
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 
 import pandas as pd
+import xlsxwriter
+
+try:
+    import orjson  # type: ignore
+except ModuleNotFoundError:
+    orjson = None  # type: ignore
 
 # ----------------------------
 # Streamlit 런타임/모듈 체크
@@ -51,7 +60,9 @@ def is_streamlit_runtime() -> bool:
 APP_TITLE = "영업보고서"
 DATA_DIR = Path("data")
 DB_PATH = DATA_DIR / "sales_records.json"
-OAUTH_TOKEN = Path("token.pkl")
+DB_LOG_PATH = DATA_DIR / "sales_records.jsonl"
+OAUTH_TOKEN_PKL = Path("token.pkl")  # 구버전 pickle 토큰 (1회 마이그레이션 후 삭제)
+OAUTH_TOKEN = Path("token.json")
 OAUTH_CREDENTIALS = Path("credentials.json")
 
 CHARGER_MODELS = [
@@ -66,6 +77,8 @@ ANCILLARY_ITEMS = [
 
 STATUS_CHOICES = ["진행중", "완료", "불가"]
 
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
 MOBILE_PREFIXES = {"010", "011", "016", "017", "018", "019"}
 AREA3 = {"031","032","033","041","042","043","044","051","052","053","054","055","061","062","063","064"}
 SERVICE_3 = {"070","050","080"}
@@ -74,22 +87,112 @@ SERVICE_3 = {"070","050","080"}
 # 유틸
 # ----------------------------
 
+def _dumps(obj) -> bytes:
+    """DB 직렬화: orjson(C 확장) 우선, 없으면 stdlib json 폴백."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _dumps_line(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 def ensure_dirs() -> None:
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     if not DB_PATH.exists():
-        DB_PATH.write_text(json.dumps({"records": []}, ensure_ascii=False, indent=2), encoding="utf-8")
+        DB_PATH.write_bytes(_dumps({"records": []}))
+
+
+def _db_mtime() -> float:
+    m = DB_PATH.stat().st_mtime if DB_PATH.exists() else 0.0
+    if DB_LOG_PATH.exists():
+        m = max(m, DB_LOG_PATH.stat().st_mtime)
+    return m
+
+
+def _apply_log_entry(db: Dict, entry: Dict) -> None:
+    records = db.setdefault("records", [])
+    op = entry.get("op")
+    if op == "put":
+        rec = entry.get("record") or {}
+        rid = rec.get("id")
+        for i, r in enumerate(records):
+            if r.get("id") == rid:
+                records[i] = rec
+                break
+        else:
+            records.append(rec)
+    elif op == "del":
+        rid = entry.get("id")
+        db["records"] = [r for r in records if r.get("id") != rid]
+
+
+def _read_db_from_disk() -> Dict:
+    db = _loads(DB_PATH.read_bytes())
+    if DB_LOG_PATH.exists():
+        with DB_LOG_PATH.open("rb") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    _apply_log_entry(db, _loads(line))
+                except ValueError:
+                    continue  # 끊긴 마지막 줄 등은 무시
+    return db
 
 
 def load_db() -> Dict:
     ensure_dirs()
-    with DB_PATH.open("r", encoding="utf-8") as f:
-        return json.load(f)
+    mtime = _db_mtime()
+    if is_streamlit_runtime():
+        if st.session_state.get("_db_mtime") == mtime and "db" in st.session_state:
+            return st.session_state.db
+        st.session_state._db_mtime = mtime
+    return _read_db_from_disk()
+
+
+def append_log(entry: Dict) -> None:
+    """저장/수정/삭제를 O(1) 한 줄 추가로 기록 (전체 재직렬화 회피)."""
+    ensure_dirs()
+    with DB_LOG_PATH.open("ab") as f:
+        f.write(_dumps_line(entry) + b"\n")
+    if is_streamlit_runtime():
+        st.session_state._db_mtime = _db_mtime()
+
+
+def record_put(rec: Dict) -> None:
+    append_log({"op": "put", "record": rec})
+
+
+def record_delete(record_id: str) -> None:
+    append_log({"op": "del", "id": record_id})
 
 
 def save_db(db: Dict) -> None:
     ensure_dirs()
-    with DB_PATH.open("w", encoding="utf-8") as f:
-        json.dump(db, f, ensure_ascii=False, indent=2)
+    DB_PATH.write_bytes(_dumps(db))
+
+
+def compact_db() -> None:
+    """로그를 정식 JSON에 병합하고 로그를 비운다 (종료 시 자동 실행)."""
+    if not DB_LOG_PATH.exists():
+        return
+    db = _read_db_from_disk()
+    save_db(db)
+    DB_LOG_PATH.unlink(missing_ok=True)
+
+
+atexit.register(compact_db)
 
 
 def now_str() -> str:
@@ -100,8 +203,55 @@ def fmt_date(d: date) -> str:
     return d.strftime("%Y-%m-%d")
 
 
+_NON_DIGIT = re.compile(r"\D")
+
+
 def strip_digits(s: str) -> str:
-    return re.sub(r"\D", "", s or "")
+    return _NON_DIGIT.sub("", s or "")
+
+
+def _fmt_seoul(digits: str) -> str:
+    if len(digits) <= 2:
+        return digits
+    if 3 <= len(digits) <= 5:
+        return f"02-{digits[2:]}"
+    if 6 <= len(digits) <= 9:
+        return f"02-{digits[2:5]}-{digits[5:9]}"
+    return f"02-{digits[2:6]}-{digits[6:10]}"
+
+
+def _fmt_service(digits: str) -> str:
+    if len(digits) <= 3:
+        return digits
+    if 4 <= len(digits) <= 7:
+        return f"{digits[:3]}-{digits[3:]}"
+    return f"{digits[:3]}-{digits[3:7]}-{digits[7:11]}"
+
+
+def _fmt_mobile(digits: str) -> str:
+    if len(digits) <= 3:
+        return digits
+    if 4 <= len(digits) <= 7:
+        return f"{digits[:3]}-{digits[3:]}"
+    if len(digits) == 10:
+        return f"{digits[:3]}-{digits[3:6]}-{digits[6:10]}"
+    return f"{digits[:3]}-{digits[3:7]}-{digits[7:11]}"
+
+
+def _fmt_area(digits: str) -> str:
+    if len(digits) <= 3:
+        return digits
+    if 4 <= len(digits) <= 6:
+        return f"{digits[:3]}-{digits[3:]}"
+    return f"{digits[:3]}-{digits[3:6]}-{digits[6:10]}"
+
+
+# 접두사 3자리 → 포맷터 O(1) 디스패치 (키 입력마다 호출되는 핫패스)
+_PREFIX_FORMATTERS: Dict[str, Callable[[str], str]] = {
+    **{p: _fmt_service for p in SERVICE_3},
+    **{p: _fmt_mobile for p in MOBILE_PREFIXES},
+    **{p: _fmt_area for p in AREA3},
+}
 
 
 def format_korean_phone(raw: str) -> str:
@@ -111,33 +261,10 @@ def format_korean_phone(raw: str) -> str:
     if len(digits) == 8 and digits[:2] in {"15", "16", "18"}:
         return f"{digits[:4]}-{digits[4:8]}"
     if digits.startswith("02"):
-        if len(digits) <= 2:
-            return digits
-        if 3 <= len(digits) <= 5:
-            return f"02-{digits[2:]}"
-        if 6 <= len(digits) <= 9:
-            return f"02-{digits[2:5]}-{digits[5:9]}"
-        return f"02-{digits[2:6]}-{digits[6:10]}"
-    if digits[:3] in SERVICE_3:
-        if len(digits) <= 3:
-            return digits
-        if 4 <= len(digits) <= 7:
-            return f"{digits[:3]}-{digits[3:]}"
-        return f"{digits[:3]}-{digits[3:7]}-{digits[7:11]}"
-    if digits[:3] in MOBILE_PREFIXES:
-        if len(digits) <= 3:
-            return digits
-        if 4 <= len(digits) <= 7:
-            return f"{digits[:3]}-{digits[3:]}"
-        if len(digits) == 10:
-            return f"{digits[:3]}-{digits[3:6]}-{digits[6:10]}"
-        return f"{digits[:3]}-{digits[3:7]}-{digits[7:11]}"
-    if digits[:3] in AREA3:
-        if len(digits) <= 3:
-            return digits
-        if 4 <= len(digits) <= 6:
-            return f"{digits[:3]}-{digits[3:]}"
-        return f"{digits[:3]}-{digits[3:6]}-{digits[6:10]}"
+        return _fmt_seoul(digits)
+    fmt = _PREFIX_FORMATTERS.get(digits[:3])
+    if fmt is not None:
+        return fmt(digits)
     if len(digits) == 8:
         return f"{digits[:4]}-{digits[4:8]}"
     if len(digits) == 10:
@@ -157,10 +284,46 @@ def summarize_record(rec: Dict) -> str:
     return f"{rec.get('date','')} | {rec.get('site_name','')} | {rec.get('salesperson','')} | {rec.get('status','')}"
 
 
+def search_blob(rec: Dict) -> str:
+    return f"{rec.get('date','')} {rec.get('site_name','')} {rec.get('salesperson','')} {rec.get('status','')}".lower()
+
+
+if STREAMLIT_AVAILABLE:
+    # 사이드바 목록은 DB가 바뀔 때만 다시 만든다.
+    # 캐시는 프로세스 전역(세션 간 공유)이므로 키는 세션 카운터가 아니라
+    # 레코드 내용에서 유도한 지문(db_fingerprint)이어야 한다.
+    @st.cache_data(max_entries=8, show_spinner=False)
+    def _record_summaries(fingerprint: tuple, _records: List[Dict]) -> List[tuple]:
+        # 저장 시점에 _search가 없던 기존 레코드는 여기서 1회 보충
+        return [(summarize_record(r), r.get("_search") or search_blob(r), r["id"]) for r in _records]
+
+    # 요약 미리보기도 DB가 바뀔 때만 다시 만든다
+    @st.cache_data(max_entries=8, show_spinner=False)
+    def _preview_frame(fingerprint: tuple, _records: List[Dict]) -> pd.DataFrame:
+        # 최근 15건을 역순으로 한 번만 훑고, 컬럼 단위(dict of lists)로 조립
+        sliced = list(islice(reversed(_records), 15))
+        return pd.DataFrame({
+            "날짜": [r.get("date", "") for r in sliced],
+            "현장명": [r.get("site_name", "") for r in sliced],
+            "영업자": [r.get("salesperson", "") for r in sliced],
+            "진행": [r.get("status", "") for r in sliced],
+            "연락처": [r.get("phone", "") for r in sliced],
+            "충전기합계": [r.get("totals", {}).get("chargers_total", 0) for r in sliced],
+            "부대공사합계": [r.get("totals", {}).get("ancillaries_total", 0) for r in sliced],
+        })
+
+
 def tot_qty(mapping: Dict[str, int]) -> int:
     return int(sum(int(v or 0) for v in mapping.values()))
 
 
+def _as_int(v) -> int:
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return 0
+
+
 def blank_extras_df() -> pd.DataFrame:
     return pd.DataFrame({
         "모델명": pd.Series(dtype="string"),
@@ -188,6 +351,27 @@ def build_record(
 ) -> Dict:
     if record_id is None:
         record_id = make_record_id()
+    # 수량 딕셔너리와 합계를 한 번의 순회로 동시에 계산
+    chargers: Dict[str, int] = {}
+    chargers_total = 0
+    for k in CHARGER_MODELS:
+        v = _as_int(charger_counts.get(k))
+        chargers[k] = v
+        chargers_total += v
+    ancillaries: Dict[str, int] = {}
+    ancillaries_total = 0
+    for k in ANCILLARY_ITEMS:
+        v = _as_int(ancillary_counts.get(k))
+        ancillaries[k] = v
+        ancillaries_total += v
+    extras: List[Dict] = []
+    extras_total = 0
+    for r in extra_rows:
+        name = str(r.get("모델명", "")).strip()
+        qty = _as_int(r.get("수량"))
+        if name and qty > 0:
+            extras.append({"name": name, "qty": qty})
+            extras_total += qty
     rec = {
         "id": record_id,
         "created_at": now_str(),
@@ -199,57 +383,100 @@ def build_record(
         "remarks": (remarks or "").strip(),
         "status": status,
         "reason": (reason or "").strip(),
-        "chargers": {k: int(charger_counts.get(k, 0) or 0) for k in CHARGER_MODELS},
-        "ancillaries": {k: int(ancillary_counts.get(k, 0) or 0) for k in ANCILLARY_ITEMS},
-        "extras": [
-            {"name": str(r.get("모델명", "")).strip(), "qty": int(r.get("수량", 0) or 0)}
-            for r in extra_rows
-            if str(r.get("모델명", "")).strip() and int(r.get("수량", 0) or 0) > 0
-        ],
-    }
-    rec["totals"] = {
-        "chargers_total": tot_qty(rec["chargers"]),
-        "ancillaries_total": tot_qty(rec["ancillaries"]),
-        "extras_total": sum(int(x.get("qty", 0) or 0) for x in rec["extras"]),
+        "chargers": chargers,
+        "ancillaries": ancillaries,
+        "extras": extras,
+        "totals": {
+            "chargers_total": chargers_total,
+            "ancillaries_total": ancillaries_total,
+            "extras_total": extras_total,
+        },
     }
+    rec["_search"] = search_blob(rec)  # 사이드바 검색용 소문자 블롭(저장 시 1회 계산)
     return rec
 
 # ----------------------------
 # 엑셀 변환 (기존 기능 유지)
 # ----------------------------
 
+# constant_memory는 행 단위 순차 기록을 요구하는데 pandas to_excel은 열 단위로
+# 셀을 쓰므로 데이터가 유실된다. pandas 경유 시트는 in_memory만 사용한다.
+XLSX_WRITER_KWARGS = {"options": {"in_memory": True}}
+
+
+# 내보내기용 임시 xlsx는 프로세스 전용 디렉터리에 모아 종료 시 일괄 정리한다
+# (캐시 축출로 참조를 잃은 파일도 여기서 함께 수거된다)
+_EXPORT_TMPDIR = tempfile.TemporaryDirectory(prefix="s18_xlsx_")
+atexit.register(_EXPORT_TMPDIR.cleanup)
+
+
+def _new_xlsx_tempfile() -> Path:
+    tmp = tempfile.NamedTemporaryFile(suffix=".xlsx", dir=_EXPORT_TMPDIR.name, delete=False)
+    tmp.close()
+    return Path(tmp.name)
+
+
+def excel_file_for_record(rec: Dict) -> Path:
+    # 시트가 몇십 행뿐이라 pandas 경유 비용이 지배적 → xlsxwriter에 직접 기록.
+    # 행 순서대로만 쓰므로 여기서는 constant_memory를 켤 수 있다.
+    path = _new_xlsx_tempfile()
+    wb = xlsxwriter.Workbook(str(path), {"constant_memory": True})
+    ws = wb.add_worksheet("기본정보")
+    base_rows = [
+        ("작성일", rec.get("created_at", "")),
+        ("날짜", rec.get("date", "")),
+        ("영업자", rec.get("salesperson", "")),
+        ("현장명", rec.get("site_name", "")),
+        ("담당자", rec.get("manager_name", "")),
+        ("연락처", rec.get("phone", "")),
+        ("진행상태", rec.get("status", "")),
+        ("불가 사유", rec.get("reason", "")),
+        ("비고", rec.get("remarks", "")),
+    ]
+    ws.write_row(0, 0, ["항목", "값"])
+    for i, row in enumerate(base_rows, start=1):
+        ws.write_row(i, 0, row)
+    ws_qty = wb.add_worksheet("수량")
+    ws_qty.write_row(0, 0, ["분류", "항목", "수량"])
+    r = 1
+    for k, v in rec.get("chargers", {}).items():
+        ws_qty.write_row(r, 0, ["충전기", k, int(v or 0)])
+        r += 1
+    for k, v in rec.get("ancillaries", {}).items():
+        ws_qty.write_row(r, 0, ["부대공사", k, int(v or 0)])
+        r += 1
+    extras = rec.get("extras", [])
+    if extras:
+        ws_ex = wb.add_worksheet("기타모델")
+        ws_ex.write_row(0, 0, ["모델명", "수량"])
+        for i, x in enumerate(extras, start=1):
+            ws_ex.write_row(i, 0, [x.get("name", ""), int(x.get("qty", 0) or 0)])
+    wb.close()
+    return path
+
+
 def excel_bytes_for_record(rec: Dict) -> bytes:
-    buf = io.BytesIO()
-    with pd.ExcelWriter(buf, engine="openpyxl") as writer:
-        base_rows = [
-            ("작성일", rec.get("created_at", "")),
-            ("날짜", rec.get("date", "")),
-            ("영업자", rec.get("salesperson", "")),
-            ("현장명", rec.get("site_name", "")),
-            ("담당자", rec.get("manager_name", "")),
-            ("연락처", rec.get("phone", "")),
-            ("진행상태", rec.get("status", "")),
-            ("불가 사유", rec.get("reason", "")),
-            ("비고", rec.get("remarks", "")),
-        ]
-        pd.DataFrame(base_rows, columns=["항목", "값"]).to_excel(writer, sheet_name="기본정보", index=False)
-        rows_qty = []
-        for k, v in rec.get("chargers", {}).items():
-            rows_qty.append(("충전기", k, int(v or 0)))
-        for k, v in rec.get("ancillaries", {}).items():
-            rows_qty.append(("부대공사", k, int(v or 0)))
-        pd.DataFrame(rows_qty, columns=["분류", "항목", "수량"]).to_excel(writer, sheet_name="수량", index=False)
-        extras = rec.get("extras", [])
-        if extras:
-            pd.DataFrame(extras, columns=["name", "qty"]).rename(columns={"name": "모델명", "qty": "수량"}).to_excel(
-                writer, sheet_name="기타모델", index=False
-            )
-    return buf.getvalue()
+    path = excel_file_for_record(rec)
+    try:
+        return path.read_bytes()
+    finally:
+        path.unlink(missing_ok=True)
 
 
-def excel_bytes_for_all(records: List[Dict]) -> bytes:
-    buf = io.BytesIO()
-    with pd.ExcelWriter(buf, engine="openpyxl") as writer:
+def _category_sums(records: List[Dict]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """충전기/부대공사 합계를 파이썬 루프 대신 pandas sum으로 집계."""
+    ch_df = pd.DataFrame([r.get("chargers", {}) for r in records], columns=CHARGER_MODELS).fillna(0).astype("int64")
+    an_df = pd.DataFrame([r.get("ancillaries", {}) for r in records], columns=ANCILLARY_ITEMS).fillna(0).astype("int64")
+    ch_sum = ch_df.sum(axis=0).reset_index()
+    ch_sum.columns = ["항목", "수량"]
+    an_sum = an_df.sum(axis=0).reset_index()
+    an_sum.columns = ["항목", "수량"]
+    return ch_sum.sort_values("항목"), an_sum.sort_values("항목")
+
+
+def excel_file_for_all(records: List[Dict]) -> Path:
+    path = _new_xlsx_tempfile()
+    with pd.ExcelWriter(path, engine="xlsxwriter", engine_kwargs=XLSX_WRITER_KWARGS) as writer:
         rows = []
         for r in records:
             rows.append([
@@ -261,36 +488,83 @@ def excel_bytes_for_all(records: List[Dict]) -> bytes:
             "ID", "날짜", "영업자", "현장명", "담당자", "연락처", "진행상태", "불가 사유", "비고",
             "충전기 합계", "부대공사 합계", "기타 합계",
         ]).to_excel(writer, sheet_name="목록", index=False)
-        ch_sum = {k: 0 for k in CHARGER_MODELS}
-        an_sum = {k: 0 for k in ANCILLARY_ITEMS}
-        for r in records:
-            for k, v in r.get("chargers", {}).items():
-                ch_sum[k] += int(v or 0)
-            for k, v in r.get("ancillaries", {}).items():
-                an_sum[k] += int(v or 0)
-        pd.DataFrame(list(ch_sum.items()), columns=["항목", "수량"]).sort_values("항목").to_excel(writer, sheet_name="충전기합계", index=False)
-        pd.DataFrame(list(an_sum.items()), columns=["항목", "수량"]).sort_values("항목").to_excel(writer, sheet_name="부대공사합계", index=False)
-    return buf.getvalue()
+        ch_sum, an_sum = _category_sums(records)
+        ch_sum.to_excel(writer, sheet_name="충전기합계", index=False)
+        an_sum.to_excel(writer, sheet_name="부대공사합계", index=False)
+    return path
+
+
+def excel_bytes_for_all(records: List[Dict]) -> bytes:
+    path = excel_file_for_all(records)
+    try:
+        return path.read_bytes()
+    finally:
+        path.unlink(missing_ok=True)
+
+
+def record_fingerprint(rec: Dict) -> tuple:
+    return (rec.get("id", ""), rec.get("created_at", ""))
+
+
+def db_fingerprint(records: List[Dict]) -> tuple:
+    return tuple(record_fingerprint(r) for r in records)
+
+
+if STREAMLIT_AVAILABLE:
+    # 재실행마다 워크북을 다시 만들지 않도록 레코드 지문을 키로 캐시.
+    # 밑줄 인자는 Streamlit 해시 대상에서 제외된다.
+    @st.cache_data(max_entries=8, show_spinner=False)
+    def excel_file_for_record_cached(fingerprint: tuple, _rec: Dict) -> Path:
+        return excel_file_for_record(_rec)
+
+    @st.cache_data(max_entries=8, show_spinner=False)
+    def excel_file_for_all_cached(fingerprint: tuple, _records: List[Dict]) -> Path:
+        return excel_file_for_all(_records)
 
 # ----------------------------
 # Google Drive 업로드 (서비스계정) 기존 유지
 # ----------------------------
 
-def upload_to_drive_via_service_account(*, file_bytes: bytes, filename: str, folder_id: str, service_account_info: dict) -> Dict:
+@lru_cache(maxsize=None)
+def _drive_modules():
+    """무거운 googleapiclient 스택을 최초 사용 시 1회만 import."""
+    from google.oauth2 import service_account  # type: ignore
+    from googleapiclient.discovery import build  # type: ignore
+    from googleapiclient.http import MediaInMemoryUpload  # type: ignore
+    return service_account, build, MediaInMemoryUpload
+
+
+@lru_cache(maxsize=None)
+def _gspread():
+    import gspread  # type: ignore
+    return gspread
+
+
+def _build_drive_service(svc_json_bytes: bytes):
+    service_account, build, _ = _drive_modules()
+    info = json.loads(svc_json_bytes)
+    creds = service_account.Credentials.from_service_account_info(info, scopes=["https://www.googleapis.com/auth/drive.file"])
+    return build("drive", "v3", credentials=creds, cache_discovery=False)
+
+
+if STREAMLIT_AVAILABLE:
+    # 업로드 클릭마다 자격 증명 생성 + discovery 문서 페치를 반복하지 않도록
+    # 서비스 계정 JSON 바이트를 키로 서비스 객체를 재사용
+    _build_drive_service = st.cache_resource(show_spinner=False)(_build_drive_service)
+
+
+def upload_to_drive_via_service_account(*, file_bytes: bytes, filename: str, folder_id: str, service_json_bytes: bytes) -> Dict:
     try:
-        from google.oauth2 import service_account  # type: ignore
-        from googleapiclient.discovery import build  # type: ignore
-        from googleapiclient.http import MediaIoBaseUpload  # type: ignore
+        _, _, MediaInMemoryUpload = _drive_modules()
     except Exception as e:
         raise ImportError(
             "구글 드라이브 업로드 모듈이 설치되어 있지 않습니다.\n"
             "pip install google-api-python-client google-auth google-auth-httplib2"
         ) from e
-    creds = service_account.Credentials.from_service_account_info(service_account_info, scopes=["https://www.googleapis.com/auth/drive.file"])
-    service = build("drive", "v3", credentials=creds)
-    media = MediaIoBaseUpload(io.BytesIO(file_bytes), mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", resumable=False)
+    service = _build_drive_service(service_json_bytes)
+    media = MediaInMemoryUpload(file_bytes, mimetype=XLSX_MIME, resumable=False)
     created = service.files().create(
-        body={"name": filename, "parents": [folder_id], "mimeType": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"},
+        body={"name": filename, "parents": [folder_id], "mimeType": XLSX_MIME},
         media_body=media,
         fields="id, webViewLink, webContentLink",
     ).execute()
@@ -300,11 +574,21 @@ def upload_to_drive_via_service_account(*, file_bytes: bytes, filename: str, fol
 # Google Sheets 내보내기 (OAuth, 사용자 계정)
 # ----------------------------
 
+def save_uploaded_credentials(cred_file) -> None:
+    """업로드된 credentials.json을 저장. 내용이 같으면 재기록하지 않는다."""
+    if cred_file is None:
+        return
+    data = cred_file.getvalue()
+    h = hashlib.blake2b(data, digest_size=16).hexdigest()
+    if st.session_state.get("_cred_hash") != h or not OAUTH_CREDENTIALS.exists():
+        OAUTH_CREDENTIALS.write_bytes(data)
+        st.session_state._cred_hash = h
+
+
 def oauth_get_gspread_client() -> "gspread.Client":
-    import gspread
-    from gspread_dataframe import set_with_dataframe
-    from google_auth_oauthlib.flow import InstalledAppFlow
+    gspread = _gspread()
     from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
 
     SCOPES = [
         "https://www.googleapis.com/auth/spreadsheets",
@@ -312,74 +596,81 @@ def oauth_get_gspread_client() -> "gspread.Client":
     ]
 
     creds = None
+    needs_save = False
     if OAUTH_TOKEN.exists():
-        with OAUTH_TOKEN.open("rb") as f:
+        creds = Credentials.from_authorized_user_info(json.loads(OAUTH_TOKEN.read_text()), SCOPES)
+    elif OAUTH_TOKEN_PKL.exists():
+        # 구버전 pickle 토큰은 1회 읽어 JSON으로 마이그레이션
+        with OAUTH_TOKEN_PKL.open("rb") as f:
             creds = pickle.load(f)
+        needs_save = True
     if not creds or not getattr(creds, "valid", False):
         if creds and getattr(creds, "expired", False) and getattr(creds, "refresh_token", None):
             creds.refresh(Request())
         else:
             if not OAUTH_CREDENTIALS.exists():
                 raise FileNotFoundError("credentials.json 파일이 필요합니다. 상단에서 업로드해 주세요.")
+            from google_auth_oauthlib.flow import InstalledAppFlow
             flow = InstalledAppFlow.from_client_secrets_file(str(OAUTH_CREDENTIALS), SCOPES)
             creds = flow.run_local_server(port=0)
-        with OAUTH_TOKEN.open("wb") as f:
-            pickle.dump(creds, f)
+        needs_save = True
+    if needs_save:
+        OAUTH_TOKEN.write_text(creds.to_json())
+        OAUTH_TOKEN_PKL.unlink(missing_ok=True)
     return gspread.authorize(creds)
 
 
 def gsheet_export_record(rec: Dict) -> str:
-    import gspread
-    from gspread_dataframe import set_with_dataframe
     client = oauth_get_gspread_client()
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
     ss_title = f"영업보고서_현재입력_{ts}"
     ss = client.create(ss_title)
-    sh1 = ss.sheet1
-    sh1.update_title("기본정보")
+    ss.sheet1.update_title("기본정보")
 
-    # 기본정보
     base_rows = [
-        ("작성일", rec.get("created_at", "")),
-        ("날짜", rec.get("date", "")),
-        ("영업자", rec.get("salesperson", "")),
-        ("현장명", rec.get("site_name", "")),
-        ("담당자", rec.get("manager_name", "")),
-        ("연락처", rec.get("phone", "")),
-        ("진행상태", rec.get("status", "")),
-        ("불가 사유", rec.get("reason", "")),
-        ("비고", rec.get("remarks", "")),
+        ["작성일", rec.get("created_at", "")],
+        ["날짜", rec.get("date", "")],
+        ["영업자", rec.get("salesperson", "")],
+        ["현장명", rec.get("site_name", "")],
+        ["담당자", rec.get("manager_name", "")],
+        ["연락처", rec.get("phone", "")],
+        ["진행상태", rec.get("status", "")],
+        ["불가 사유", rec.get("reason", "")],
+        ["비고", rec.get("remarks", "")],
     ]
-    set_with_dataframe(sh1, pd.DataFrame(base_rows, columns=["항목", "값"]))
-
-    # 수량
-    sh2 = ss.add_worksheet(title="수량", rows=100, cols=20)
     rows_qty = []
     for k, v in rec.get("chargers", {}).items():
-        rows_qty.append(("충전기", k, int(v or 0)))
+        rows_qty.append(["충전기", k, int(v or 0)])
     for k, v in rec.get("ancillaries", {}).items():
-        rows_qty.append(("부대공사", k, int(v or 0)))
-    set_with_dataframe(sh2, pd.DataFrame(rows_qty, columns=["분류", "항목", "수량"]))
-
-    # 기타모델
+        rows_qty.append(["부대공사", k, int(v or 0)])
     extras = rec.get("extras", [])
+
+    # 탭 생성과 값 기록을 각각 1회의 배치 요청으로 묶어 왕복을 최소화
+    add_requests = [{"addSheet": {"properties": {"title": "수량"}}}]
+    if extras:
+        add_requests.append({"addSheet": {"properties": {"title": "기타모델"}}})
+    ss.batch_update({"requests": add_requests})
+
+    data = [
+        {"range": "기본정보!A1", "values": [["항목", "값"], *base_rows]},
+        {"range": "수량!A1", "values": [["분류", "항목", "수량"], *rows_qty]},
+    ]
     if extras:
-        sh3 = ss.add_worksheet(title="기타모델", rows=200, cols=20)
-        df_ex = pd.DataFrame(extras, columns=["name", "qty"]).rename(columns={"name": "모델명", "qty": "수량"})
-        set_with_dataframe(sh3, df_ex)
+        data.append({
+            "range": "기타모델!A1",
+            "values": [["모델명", "수량"], *[[x.get("name", ""), int(x.get("qty", 0) or 0)] for x in extras]],
+        })
+    ss.values_batch_update({"valueInputOption": "RAW", "data": data})
 
     return ss.url
 
 
 def gsheet_export_all(records: List[Dict]) -> str:
-    import gspread
-    from gspread_dataframe import set_with_dataframe
     client = oauth_get_gspread_client()
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
     ss_title = f"영업보고서_목록_{ts}"
     ss = client.create(ss_title)
-    sh1 = ss.sheet1
-    sh1.update_title("목록")
+    ss.sheet1.update_title("목록")
 
     rows = []
     for r in records:
@@ -388,23 +679,23 @@ def gsheet_export_all(records: List[Dict]) -> str:
             r.get("manager_name", ""), r.get("phone", ""), r.get("status", ""), r.get("reason", ""), r.get("remarks", ""),
             r.get("totals", {}).get("chargers_total", 0), r.get("totals", {}).get("ancillaries_total", 0), r.get("totals", {}).get("extras_total", 0),
         ])
-    set_with_dataframe(sh1, pd.DataFrame(rows, columns=[
+    header = [
         "ID", "날짜", "영업자", "현장명", "담당자", "연락처", "진행상태", "불가 사유", "비고",
         "충전기 합계", "부대공사 합계", "기타 합계",
-    ]))
+    ]
 
-    # 합계 탭들
-    ch_sum = {k: 0 for k in CHARGER_MODELS}
-    an_sum = {k: 0 for k in ANCILLARY_ITEMS}
-    for r in records:
-        for k, v in r.get("chargers", {}).items():
-            ch_sum[k] += int(v or 0)
-        for k, v in r.get("ancillaries", {}).items():
-            an_sum[k] += int(v or 0)
-    sh2 = ss.add_worksheet(title="충전기합계", rows=200, cols=20)
-    sh3 = ss.add_worksheet(title="부대공사합계", rows=200, cols=20)
-    set_with_dataframe(sh2, pd.DataFrame(list(ch_sum.items()), columns=["항목", "수량"]).sort_values("항목"))
-    set_with_dataframe(sh3, pd.DataFrame(list(an_sum.items()), columns=["항목", "수량"]).sort_values("항목"))
+    # 합계 탭들 — 탭 생성 1회 + 값 기록 1회 배치 요청.
+    # (두 호출은 탭이 먼저 존재해야 하는 순서 의존이라 병렬화 여지가 없음)
+    ch_sum, an_sum = _category_sums(records)
+    ss.batch_update({"requests": [
+        {"addSheet": {"properties": {"title": "충전기합계"}}},
+        {"addSheet": {"properties": {"title": "부대공사합계"}}},
+    ]})
+    ss.values_batch_update({"valueInputOption": "RAW", "data": [
+        {"range": "목록!A1", "values": [header, *rows]},
+        {"range": "충전기합계!A1", "values": [["항목", "수량"], *[[k, int(v)] for k, v in ch_sum.itertuples(index=False)]]},
+        {"range": "부대공사합계!A1", "values": [["항목", "수량"], *[[k, int(v)] for k, v in an_sum.itertuples(index=False)]]},
+    ]})
 
     return ss.url
 
@@ -417,42 +708,58 @@ def phone_on_change():
     st.session_state.ui_form_phone = format_korean_phone(v)
 
 
+if STREAMLIT_AVAILABLE:
+    # 연락처 키 입력마다 전체 스크립트가 아닌 이 블록만 재실행된다.
+    @st.fragment
+    def phone_widget():
+        st.subheader("연락처")
+        st.text_input(
+            "연락처 (실시간 자동 하이픈)",
+            key="ui_form_phone",
+            on_change=phone_on_change,
+            placeholder="예) 01012345678, 0212345678, 15881234",
+        )
+        st.caption(f"현재 입력: {st.session_state.get('ui_form_phone','')}")
+
+
 def init_session():
     if not STREAMLIT_AVAILABLE:
         return
     if "db" not in st.session_state:
         st.session_state.db = load_db()
-    if "editing_id" not in st.session_state:
-        st.session_state.editing_id = None
-    if "pending_load_id" not in st.session_state:
-        st.session_state.pending_load_id = None
     if "extras_data" not in st.session_state:
         st.session_state.extras_data = blank_extras_df()
-    if "ui_form_phone" not in st.session_state:
-        st.session_state.ui_form_phone = ""
+    # 단순 기본값은 한 번의 update 호출로 일괄 설정
+    defaults = {"db_version": 0, "editing_id": None, "pending_load_id": None, "ui_form_phone": ""}
+    missing = {k: v for k, v in defaults.items() if k not in st.session_state}
+    if missing:
+        st.session_state.update(missing)
 
 
 def set_form_from_record(rec: Dict) -> None:
-    st.session_state.form_date = datetime.strptime(rec.get("date", fmt_date(date.today())), "%Y-%m-%d").date()
-    st.session_state.form_salesperson = rec.get("salesperson", "")
-    st.session_state.form_site = rec.get("site_name", "")
-    st.session_state.form_manager = rec.get("manager_name", "")
-    st.session_state.ui_form_phone = rec.get("phone", "")
-    st.session_state.form_remarks = rec.get("remarks", "")
-    st.session_state.form_status = rec.get("status", STATUS_CHOICES[0])
-    st.session_state.form_reason = rec.get("reason", "")
-    for k in CHARGER_MODELS:
-        st.session_state[f"qty_ch_{k}"] = int(rec.get("chargers", {}).get(k, 0) or 0)
-    for k in ANCILLARY_ITEMS:
-        st.session_state[f"qty_an_{k}"] = int(rec.get("ancillaries", {}).get(k, 0) or 0)
+    chargers = rec.get("chargers", {})
+    ancillaries = rec.get("ancillaries", {})
+    st.session_state.update({
+        "form_date": date.fromisoformat(rec.get("date") or date.today().isoformat()),
+        "form_salesperson": rec.get("salesperson", ""),
+        "form_site": rec.get("site_name", ""),
+        "form_manager": rec.get("manager_name", ""),
+        "ui_form_phone": rec.get("phone", ""),
+        "form_remarks": rec.get("remarks", ""),
+        "form_status": rec.get("status", STATUS_CHOICES[0]),
+        "form_reason": rec.get("reason", ""),
+        **{f"qty_ch_{k}": int(chargers.get(k, 0) or 0) for k in CHARGER_MODELS},
+        **{f"qty_an_{k}": int(ancillaries.get(k, 0) or 0) for k in ANCILLARY_ITEMS},
+    })
     ex = rec.get("extras", [])
-    df = pd.DataFrame([{"모델명": e.get("name", ""), "수량": int(e.get("qty", 0) or 0)} for e in ex])
-    if df.empty:
-        df = blank_extras_df()
-    else:
-        df["모델명"] = df["모델명"].astype("string")
-        df["수량"] = pd.to_numeric(df["수량"], errors="coerce").astype("Int64")
-    st.session_state.extras_data = df
+    if not ex:
+        st.session_state.extras_data = blank_extras_df()
+        return
+    # 목표 dtype으로 바로 생성 (생성 후 astype 변환 2회 제거)
+    st.session_state.extras_data = pd.DataFrame({
+        "모델명": pd.array([str(e.get("name", "")) for e in ex], dtype="string"),
+        "수량": pd.array([int(e.get("qty", 0) or 0) for e in ex], dtype="Int64"),
+    })
 
 
 def sidebar_records_ui():
@@ -460,11 +767,9 @@ def sidebar_records_ui():
     db = st.session_state.db
     records = db.get("records", [])
     q = st.sidebar.text_input("검색(날짜/현장/영업자/상태)", key="search_q")
-    def match(r: Dict) -> bool:
-        s = (r.get("date", "") + " " + r.get("site_name", "") + " " + r.get("salesperson", "") + " " + r.get("status", "")).lower()
-        return (q or "").lower() in s
-    filtered = [r for r in records if match(r)]
-    options = {summarize_record(r): r["id"] for r in filtered}
+    summaries = _record_summaries(db_fingerprint(records), records)
+    q_lower = (q or "").lower()
+    options = {label: rid for label, blob, rid in summaries if q_lower in blob}
     chosen_id = None
     if options:
         chosen_label = st.sidebar.selectbox("레코드 선택", list(options.keys()), index=0)
@@ -479,31 +784,41 @@ def sidebar_records_ui():
             st.rerun()
     with col2:
         if st.button("새 입력", use_container_width=True):
-            st.session_state.editing_id = None
-            st.session_state.form_date = date.today()
-            st.session_state.form_salesperson = ""
-            st.session_state.form_site = ""
-            st.session_state.form_manager = ""
-            st.session_state.ui_form_phone = ""
-            st.session_state.form_remarks = ""
-            st.session_state.form_status = STATUS_CHOICES[0]
-            st.session_state.form_reason = ""
-            st.session_state.extras_data = blank_extras_df()
-            for k in CHARGER_MODELS:
-                st.session_state[f"qty_ch_{k}"] = 0
-            for k in ANCILLARY_ITEMS:
-                st.session_state[f"qty_an_{k}"] = 0
+            st.session_state.update({
+                "editing_id": None,
+                "form_date": date.today(),
+                "form_salesperson": "",
+                "form_site": "",
+                "form_manager": "",
+                "ui_form_phone": "",
+                "form_remarks": "",
+                "form_status": STATUS_CHOICES[0],
+                "form_reason": "",
+                "extras_data": blank_extras_df(),
+                **{f"qty_ch_{k}": 0 for k in CHARGER_MODELS},
+                **{f"qty_an_{k}": 0 for k in ANCILLARY_ITEMS},
+            })
             st.rerun()
     with col3:
         if st.button("삭제", use_container_width=True, disabled=chosen_id is None):
             if chosen_id is not None:
                 db["records"] = [r for r in records if r["id"] != chosen_id]
-                save_db(db)
+                record_delete(chosen_id)
                 st.session_state.db = db
+                st.session_state.db_version = st.session_state.get("db_version", 0) + 1
                 st.toast("삭제 완료", icon="✅")
                 st.rerun()
 
 
+def _record_by_id(rid: Optional[str]) -> Optional[Dict]:
+    """id → 레코드 인덱스 조회. db_version이 바뀐 경우에만 1회 재구축."""
+    cur_ver = st.session_state.get("db_version", 0)
+    if st.session_state.get("_index_version") != cur_ver:
+        st.session_state.records_by_id = {r["id"]: r for r in st.session_state.db.get("records", [])}
+        st.session_state._index_version = cur_ver
+    return st.session_state.records_by_id.get(rid)
+
+
 def main():
     st.set_page_config(page_title=APP_TITLE, layout="wide")
     st.title(APP_TITLE)
@@ -515,20 +830,13 @@ def main():
     if st.session_state.pending_load_id:
         rid = st.session_state.pending_load_id
         st.session_state.pending_load_id = None
-        target = next((r for r in st.session_state.db.get("records", []) if r.get("id") == rid), None)
+        target = _record_by_id(rid)
         if target:
             set_form_from_record(target)
 
-    # 1) 연락처 입력(폼 밖, 실시간 하이픈)
-    st.subheader("연락처")
-    ui_form_phone = st.text_input(
-        "연락처 (실시간 자동 하이픈)",
-        key="ui_form_phone",
-        value=st.session_state.get("ui_form_phone", ""),
-        on_change=lambda: st.session_state.update({"ui_form_phone": format_korean_phone(st.session_state.get("ui_form_phone", ""))}),
-        placeholder="예) 01012345678, 0212345678, 15881234"
-    )
-    st.caption(f"현재 입력: {st.session_state.get('ui_form_phone','')}")
+    # 1) 연락처 입력(폼 밖, 실시간 하이픈, 부분 재실행)
+    phone_widget()
+    ui_form_phone = st.session_state.get("ui_form_phone", "")
 
     # 2) 나머지 입력(폼)
     with st.form(key="report_form", clear_on_submit=False):
@@ -599,21 +907,20 @@ def main():
         if errs:
             st.error("\n".join(["입력 오류:"] + [f"- {e}" for e in errs]))
         else:
-            extra_rows: List[Dict[str, str | int]] = []
             df_ex = extras_df.copy() if isinstance(extras_df, pd.DataFrame) else blank_extras_df()
             if "모델명" in df_ex:
-                df_ex["모델명"] = df_ex["모델명"].astype("string").fillna("")
+                df_ex["모델명"] = df_ex["모델명"].astype("string").str.strip().fillna("")
             else:
                 df_ex["모델명"] = ""
             if "수량" in df_ex:
                 df_ex["수량"] = pd.to_numeric(df_ex["수량"], errors="coerce").fillna(0).astype(int)
             else:
                 df_ex["수량"] = 0
-            for _, row in df_ex.iterrows():
-                name = str(row.get("모델명", "")).strip()
-                qty = int(row.get("수량", 0) or 0)
-                if name and qty > 0:
-                    extra_rows.append({"모델명": name, "수량": qty})
+            mask = (df_ex["모델명"] != "") & (df_ex["수량"] > 0)
+            extra_rows: List[Dict[str, str | int]] = [
+                {"모델명": n, "수량": int(q)}
+                for n, q in zip(df_ex.loc[mask, "모델명"], df_ex.loc[mask, "수량"])
+            ]
             st.session_state.extras_data = df_ex.copy()
 
             formatted_phone = format_korean_phone(ui_form_phone)
@@ -645,8 +952,9 @@ def main():
                         break
                 st.toast("완료", icon="✅")
             db["records"] = all_recs
-            save_db(db)
+            record_put(rec)
             st.session_state.db = db
+            st.session_state.db_version = st.session_state.get("db_version", 0) + 1
             st.rerun()
 
     # 내보내기/업로드
@@ -658,20 +966,18 @@ def main():
         st.write("**엑셀 다운로드**")
         dl_choice = st.radio("대상", ["현재 입력", "전체 목록"], horizontal=True, key="dl_choice")
         if dl_choice == "현재 입력":
-            cur = None
-            if st.session_state.editing_id is not None:
-                cur = next((r for r in st.session_state.db.get("records", []) if r.get("id") == st.session_state.editing_id), None)
+            cur = _record_by_id(st.session_state.editing_id)
             if cur is not None:
-                xls_bytes = excel_bytes_for_record(cur)
-                st.download_button("현재 입력건 다운로드", data=xls_bytes, file_name=f"영업보고서_{cur.get('date','')}_{cur.get('site_name','')}.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", use_container_width=True)
+                xls_path = excel_file_for_record_cached(record_fingerprint(cur), cur)
+                st.download_button("현재 입력건 다운로드", data=xls_path.open("rb"), file_name=f"영업보고서_{cur.get('date','')}_{cur.get('site_name','')}.xlsx", mime=XLSX_MIME, use_container_width=True)
             else:
                 st.info("먼저 저장(또는 완료)하여 레코드를 만든 뒤 다운로드할 수 있습니다.")
         else:
             recs = st.session_state.db.get("records", [])
             if recs:
-                xls_all = excel_bytes_for_all(recs)
+                xls_all_path = excel_file_for_all_cached(db_fingerprint(recs), recs)
                 today_str = datetime.now().strftime("%Y%m%d")
-                st.download_button("전체 목록 다운로드", data=xls_all, file_name=f"영업보고서_목록_{today_str}.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", use_container_width=True)
+                st.download_button("전체 목록 다운로드", data=xls_all_path.open("rb"), file_name=f"영업보고서_목록_{today_str}.xlsx", mime=XLSX_MIME, use_container_width=True)
             else:
                 st.info("저장된 레코드가 없습니다.")
 
@@ -683,17 +989,15 @@ def main():
         can_upload = service_json_file is not None and folder_id.strip() != ""
         if st.button("구글 드라이브로 업로드", use_container_width=True, disabled=not can_upload):
             try:
-                svc_info = json.load(service_json_file)
+                svc_bytes = service_json_file.getvalue()
                 if up_choice == "현재 입력":
-                    cur = None
-                    if st.session_state.editing_id is not None:
-                        cur = next((r for r in st.session_state.db.get("records", []) if r.get("id") == st.session_state.editing_id), None)
+                    cur = _record_by_id(st.session_state.editing_id)
                     if cur is None:
                         st.error("현재 입력건이 없습니다. 먼저 저장하세요.")
                     else:
                         file_bytes = excel_bytes_for_record(cur)
                         fname = f"영업보고서_{cur.get('date','')}_{cur.get('site_name','')}.xlsx"
-                        created = upload_to_drive_via_service_account(file_bytes=file_bytes, filename=fname, folder_id=folder_id, service_account_info=svc_info)
+                        created = upload_to_drive_via_service_account(file_bytes=file_bytes, filename=fname, folder_id=folder_id, service_json_bytes=svc_bytes)
                         st.success(f"업로드 완료! 파일 ID: {created.get('id')}")
                         link = created.get("webViewLink") or created.get("webContentLink")
                         if link:
@@ -706,7 +1010,7 @@ def main():
                         file_bytes = excel_bytes_for_all(recs)
                         today_str = datetime.now().strftime("%Y%m%d")
                         fname = f"영업보고서_목록_{today_str}.xlsx"
-                        created = upload_to_drive_via_service_account(file_bytes=file_bytes, filename=fname, folder_id=folder_id, service_account_info=svc_info)
+                        created = upload_to_drive_via_service_account(file_bytes=file_bytes, filename=fname, folder_id=folder_id, service_json_bytes=svc_bytes)
                         st.success(f"업로드 완료! 파일 ID: {created.get('id')}")
                         link = created.get("webViewLink") or created.get("webContentLink")
                         if link:
@@ -718,25 +1022,22 @@ def main():
 
     with c3:
         st.write("**Google Sheets 내보내기 (OAuth)**")
-        st.caption("최초 1회 credentials.json을 업로드해 로그인하면 token.pkl이 생성되어 이후 재사용됩니다.")
+        st.caption("최초 1회 credentials.json을 업로드해 로그인하면 token.json이 생성되어 이후 재사용됩니다.")
         cred_file = st.file_uploader("credentials.json 업로드(최초 1회)", type=["json"], key="cred_json")
         colA, colB, colC = st.columns(3)
         with colA:
             if st.button("토큰 초기화", use_container_width=True):
                 try:
-                    if OAUTH_TOKEN.exists():
-                        OAUTH_TOKEN.unlink()
+                    OAUTH_TOKEN.unlink(missing_ok=True)
+                    OAUTH_TOKEN_PKL.unlink(missing_ok=True)
                     st.success("토큰 삭제 완료")
                 except Exception as e:
                     st.exception(e)
         with colB:
             if st.button("시트로 내보내기 - 현재 입력", use_container_width=True):
                 try:
-                    if cred_file is not None:
-                        OAUTH_CREDENTIALS.write_bytes(cred_file.getvalue())
-                    cur = None
-                    if st.session_state.editing_id is not None:
-                        cur = next((r for r in st.session_state.db.get("records", []) if r.get("id") == st.session_state.editing_id), None)
+                    save_uploaded_credentials(cred_file)
+                    cur = _record_by_id(st.session_state.editing_id)
                     if cur is None:
                         st.error("현재 입력건이 없습니다. 먼저 저장하세요.")
                     else:
@@ -748,8 +1049,7 @@ def main():
         with colC:
             if st.button("시트로 내보내기 - 전체 목록", use_container_width=True):
                 try:
-                    if cred_file is not None:
-                        OAUTH_CREDENTIALS.write_bytes(cred_file.getvalue())
+                    save_uploaded_credentials(cred_file)
                     recs = st.session_state.db.get("records", [])
                     if not recs:
                         st.error("내보낼 데이터가 없습니다.")
@@ -765,12 +1065,8 @@ def main():
     st.subheader("요약 미리보기")
     recs = st.session_state.db.get("records", [])
     if recs:
-        preview = [{
-            "날짜": r.get("date", ""), "현장명": r.get("site_name", ""), "영업자": r.get("salesperson", ""),
-            "진행": r.get("status", ""), "연락처": r.get("phone", ""),
-            "충전기합계": r.get("totals", {}).get("chargers_total", 0), "부대공사합계": r.get("totals", {}).get("ancillaries_total", 0),
-        } for r in recs[-15:][::-1]]
-        st.dataframe(pd.DataFrame(preview), use_container_width=True, height=320)
+        st.dataframe(_preview_frame(db_fingerprint(recs), recs),
+                     use_container_width=True, height=320)
     else:
         st.info("아직 저장된 레코드가 없습니다.")
 
@@ -807,6 +1103,16 @@ def run_tests() -> None:
     assert rec["totals"]["ancillaries_total"] == 2
     assert rec["totals"]["extras_total"] == 3
 
+    print("[TEST] _apply_log_entry...")
+    db = {"records": []}
+    _apply_log_entry(db, {"op": "put", "record": {"id": "a", "site_name": "A"}})
+    _apply_log_entry(db, {"op": "put", "record": {"id": "b", "site_name": "B"}})
+    _apply_log_entry(db, {"op": "put", "record": {"id": "a", "site_name": "A2"}})
+    assert [r["id"] for r in db["records"]] == ["a", "b"]
+    assert db["records"][0]["site_name"] == "A2"
+    _apply_log_entry(db, {"op": "del", "id": "a"})
+    assert [r["id"] for r in db["records"]] == ["b"]
+
     print("ALL TESTS PASSED")
 
 # ----------------------------
@@ -818,7 +1124,7 @@ if __name__ == "__main__":
     elif not STREAMLIT_AVAILABLE:
         print(
             "[안내] Streamlit 모듈이 설치되어 있지 않습니다.\n"
-            "  & \"C:\\Users\\customer\\AppData\\Local\\Programs\\Python\\Python313\\python.exe\" -m pip install streamlit pandas openpyxl gspread gspread-dataframe google-auth-oauthlib\n"
+            "  & \"C:\\Users\\customer\\AppData\\Local\\Programs\\Python\\Python313\\python.exe\" -m pip install streamlit pandas openpyxl gspread google-auth-oauthlib\n"
             "  & 동일 파이썬으로 -m streamlit run \"C:\\tsct\\s18.py\"\n"
         )
     elif not is_streamlit_runtime():
@@ -7,13 +7,19 @@ Streamlit 영업 보고서 관리 (웹버전)
 - 연락처 자동 하이픈(02/010 규칙)
 - 충전기 모델/부대공사 수량 + 기타모델 추가/삭제
 - 미리보기 자동 생성
-- 엑셀(.xlsx) 저장/수정/삭제/다운로드
+- 저장소는 SQLite(트랜잭션 단위 CRUD), 엑셀(.xlsx)은 다운로드 시 생성
+- 기존 엑셀/JSONL 저장본은 최초 실행 시 SQLite로 자동 이관
 - 저장 목록 표시는 ID 숨김(내부적으로만 사용)
 """
+import functools
 import io
 import json
 import os
+import re
+import sqlite3
+import uuid
 from datetime import date, datetime
+from itertools import chain
 
 import pandas as pd
 import streamlit as st
@@ -44,135 +50,219 @@ EXCEL_COLUMNS = [
 # -------------------------------
 # 유틸
 # -------------------------------
-def ensure_workbook(path: str = DEFAULT_EXCEL_PATH):
-    if not os.path.exists(path):
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Reports"
-        for i, col in enumerate(EXCEL_COLUMNS, start=1):
-            ws.cell(row=1, column=i, value=col)
-        wb.save(path)
-
-
-def retrofit_missing_ids(path: str = DEFAULT_EXCEL_PATH):
-    """ID 없는 기존 행에 ID 부여(삭제/수정 안정화)."""
-    wb = load_workbook(path)
+def _jsonl_path(path: str = DEFAULT_EXCEL_PATH) -> str:
+    return os.path.splitext(path)[0] + ".jsonl"
+
+
+def _db_path(path: str = DEFAULT_EXCEL_PATH) -> str:
+    return os.path.splitext(path)[0] + ".db"
+
+
+_COL_LIST = ", ".join(f'"{c}"' for c in EXCEL_COLUMNS)
+_PLACEHOLDERS = ", ".join("?" for _ in EXCEL_COLUMNS)
+_CREATE_SQL = "CREATE TABLE IF NOT EXISTS records (" + ", ".join(
+    f'"{c}" TEXT PRIMARY KEY' if c == "ID" else f'"{c}"' for c in EXCEL_COLUMNS
+) + ")"
+
+
+def _connect(path: str = DEFAULT_EXCEL_PATH) -> sqlite3.Connection:
+    return sqlite3.connect(_db_path(path))
+
+
+def _record_row(record: dict) -> list:
+    return [record.get(c) for c in EXCEL_COLUMNS]
+
+
+def _iter_legacy_xlsx(path: str):
+    """기존 엑셀 저장본에서 레코드 추출 (read_only, 비거나 중복된 ID는 즉석 부여)."""
+    wb = load_workbook(path, read_only=True, data_only=True)
     ws = wb.active
-    headers = [c.value for c in ws[1]]
-    idx_map = {h: i + 1 for i, h in enumerate(headers) if h}
-    id_col = idx_map.get("ID")
-    if not id_col:
-        return
-    changed = False
-    for r in range(2, ws.max_row + 1):
-        if not ws.cell(row=r, column=id_col).value:
-            new_id = f"SR-{datetime.now():%Y%m%d%H%M%S}-{str(r).zfill(4)}"
-            ws.cell(row=r, column=id_col, value=new_id)
-            changed = True
-    if changed:
-        wb.save(path)
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header:
+        seen = set()
+        for r, row in enumerate(rows, start=2):
+            if not any(v is not None for v in row):
+                continue
+            rec = dict(zip(header, row))
+            rid = rec.get("ID")
+            # 구 저장소는 초 단위 ID라 중복을 허용했다 — 행 번호로 유일화
+            if not rid or rid in seen:
+                rid = f"SR-{datetime.now():%Y%m%d%H%M%S}-{str(r).zfill(4)}"
+            rec["ID"] = rid
+            seen.add(rid)
+            yield rec
+    wb.close()
+
+
+def _iter_legacy_jsonl(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+# 테이블 생성/이관 결정은 경로당 1회면 충분 — 프로세스 전역으로 메모이즈하여
+# 세션/재실행마다 반복되던 os.stat + CREATE TABLE 호출을 없앤다
+@functools.lru_cache(maxsize=4)
+def _store_ready(path: str) -> bool:
+    db = _db_path(path)
+    fresh = not os.path.exists(db)
+    conn = _connect(path)
+    with conn:
+        conn.execute(_CREATE_SQL)
+        if fresh:
+            jl = _jsonl_path(path)
+            if os.path.exists(jl):
+                legacy = _iter_legacy_jsonl(jl)
+            elif os.path.exists(path):
+                legacy = _iter_legacy_xlsx(path)
+            else:
+                legacy = ()
+            # 이관 중 ID 충돌은 덮어쓰지 말고 그대로 실패시켜 드러낸다
+            conn.executemany(
+                f"INSERT INTO records ({_COL_LIST}) VALUES ({_PLACEHOLDERS})",
+                (_record_row(rec) for rec in legacy),
+            )
+    conn.close()
+    return True
+
+
+def ensure_store(path: str = DEFAULT_EXCEL_PATH):
+    """SQLite 저장소 준비. 기존 JSONL/엑셀 저장본이 있으면 1회 이관."""
+    _store_ready(path)
+
+
+def iter_records(path: str = DEFAULT_EXCEL_PATH):
+    ensure_store(path)
+    conn = _connect(path)
+    try:
+        for row in conn.execute(f"SELECT {_COL_LIST} FROM records"):
+            yield dict(zip(EXCEL_COLUMNS, row))
+    finally:
+        conn.close()
 
 
 def load_all(path: str = DEFAULT_EXCEL_PATH):
-    ensure_workbook(path)
-    retrofit_missing_ids(path)
-    wb = load_workbook(path)
-    ws = wb.active
-    data = ws.values
-    header = next(data)
-    rows = list(data)
-    df = pd.DataFrame(rows, columns=header)
-    df = df.dropna(how="all")
+    ensure_store(path)
+    conn = _connect(path)
+    try:
+        df = pd.read_sql_query("SELECT * FROM records", conn)
+    finally:
+        conn.close()
     return df
 
 
 def append_record(record: dict, path: str = DEFAULT_EXCEL_PATH):
-    wb = load_workbook(path)
-    ws = wb.active
-    next_row = ws.max_row + 1
-    for i, col in enumerate(EXCEL_COLUMNS, start=1):
-        ws.cell(row=next_row, column=i, value=record.get(col))
-    wb.save(path)
+    ensure_store(path)
+    with _connect(path) as conn:
+        conn.execute(
+            f"INSERT INTO records ({_COL_LIST}) VALUES ({_PLACEHOLDERS})",
+            _record_row(record),
+        )
+    conn.close()
 
 
+# "ID"가 PRIMARY KEY이므로 수정/삭제는 인덱스 탐색으로 대상 행을 찾는다
+# (과거 엑셀 저장 시절의 행 단위 ID 스캔이 필요 없음)
 def update_record(record: dict, path: str = DEFAULT_EXCEL_PATH) -> bool:
-    wb = load_workbook(path)
-    ws = wb.active
-    headers = [c.value for c in ws[1]]
-    idx_map = {h: i + 1 for i, h in enumerate(headers) if h}
-    id_col = idx_map.get("ID")
-    if not id_col:
-        return False
-    for r in range(2, ws.max_row + 1):
-        if str(ws.cell(row=r, column=id_col).value) == str(record.get("ID")):
-            for i, col in enumerate(EXCEL_COLUMNS, start=1):
-                ws.cell(row=r, column=i, value=record.get(col))
-            wb.save(path)
-            return True
-    return False
+    ensure_store(path)
+    sets = ", ".join(f'"{c}" = ?' for c in EXCEL_COLUMNS if c != "ID")
+    params = [record.get(c) for c in EXCEL_COLUMNS if c != "ID"] + [str(record.get("ID"))]
+    with _connect(path) as conn:
+        cur = conn.execute(f'UPDATE records SET {sets} WHERE "ID" = ?', params)
+    conn.close()
+    return cur.rowcount > 0
 
 
 def delete_records(ids, path: str = DEFAULT_EXCEL_PATH) -> int:
-    wb = load_workbook(path)
-    ws = wb.active
-    headers = [c.value for c in ws[1]]
-    idx_map = {h: i + 1 for i, h in enumerate(headers) if h}
-    id_col = idx_map.get("ID")
-    if not id_col:
-        return 0
-    ids = set(map(str, ids))
-    deleted = 0
-    for r in range(ws.max_row, 1, -1):
-        if str(ws.cell(row=r, column=id_col).value) in ids:
-            ws.delete_rows(r, 1)
-            deleted += 1
-    wb.save(path)
-    return deleted
+    ensure_store(path)
+    ids = [str(i) for i in ids]
+    qs = ", ".join("?" for _ in ids)
+    with _connect(path) as conn:
+        cur = conn.execute(f'DELETE FROM records WHERE "ID" IN ({qs})', ids)
+    conn.close()
+    return cur.rowcount
+
+
+_NON_DIGIT = re.compile(r"\D")
+# 길이 → 하이픈 분할 위치 (02 국번은 별도 분기)
+_PHONE_SLICES = {11: (3, 7), 10: (3, 6), 9: (3, 7)}
 
 
 def format_phone(s: str) -> str:
-    digits = "".join(ch for ch in s if ch.isdigit())
+    digits = _NON_DIGIT.sub("", s)
+    n = len(digits)
     if digits.startswith("02"):
-        if len(digits) == 10:
+        if n == 10:
             return f"{digits[:2]}-{digits[2:6]}-{digits[6:]}"
-        elif len(digits) == 9:
+        elif n == 9:
             return f"{digits[:2]}-{digits[2:5]}-{digits[5:]}"
-    if len(digits) == 11:
-        return f"{digits[:3]}-{digits[3:7]}-{digits[7:]}"
-    if len(digits) == 10:
-        return f"{digits[:3]}-{digits[3:6]}-{digits[6:]}"
-    if len(digits) == 8:
+    if n == 8:
         return f"{digits[:4]}-{digits[4:]}"
-    if len(digits) > 7:
+    cut = _PHONE_SLICES.get(n)
+    if cut:
+        a, b = cut
+        return f"{digits[:a]}-{digits[a:b]}-{digits[b:]}"
+    if n > 7:
         return f"{digits[:3]}-{digits[3:7]}-{digits[7:]}"
-    if len(digits) > 3:
+    if n > 3:
         return f"{digits[:3]}-{digits[3:]}"
     return digits
 
 
-def build_summary(model_counts: dict, accessory_counts: dict, others: list) -> str:
+def build_summary(model_counts: dict, accessory_counts: dict, others: dict) -> str:
+    # 한 번의 순회로 문자열과 총수량을 같이 누적 (문자열 재파싱 금지)
     parts = []
-    for k, v in model_counts.items():
+    total = 0
+    for k, v in chain(model_counts.items(), accessory_counts.items()):
         if v > 0:
             parts.append(f"{k} x {v}")
-    for k, v in accessory_counts.items():
-        if v > 0:
-            parts.append(f"{k} x {v}")
-    for name, qty in others:
+            total += v
+    for name, qty in others.items():
         parts.append(f"{name} x {qty}")
+        total += qty
     if not parts:
         return "— (수량 없음)"
-    total = sum(int(p.split(' x ')[1]) for p in parts if ' x ' in p)
     return ", ".join(parts) + f"  | 총 {total}개"
 
 
 def get_download_xlsx_bytes(path: str = DEFAULT_EXCEL_PATH) -> bytes:
-    wb = load_workbook(path)
+    """저장소에서 다운로드용 엑셀 생성 (openpyxl write-only: 행 단위 스트리밍)."""
+    ensure_store(path)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Reports")
+    # ws.append가 openpyxl의 행 단위 빠른 경로 (셀 단위 ws.cell 금지)
+    ws.append(EXCEL_COLUMNS)
+    for rec in iter_records(path):
+        ws.append([rec.get(c) for c in EXCEL_COLUMNS])
     buf = io.BytesIO()
     wb.save(buf)
     return buf.getvalue()
 
 
+def _store_mtime(path: str = DEFAULT_EXCEL_PATH) -> float:
+    db = _db_path(path)
+    return os.path.getmtime(db) if os.path.exists(db) else 0.0
+
+
+# 매 재실행마다 저장소 전체를 다시 읽지 않도록 mtime을 캐시 키로 사용.
+# 저장/수정/삭제가 파일을 건드리면 mtime이 바뀌어 자동 무효화된다.
+@st.cache_data(show_spinner=False)
+def load_all_cached(path: str, mtime: float):
+    return load_all(path)
+
+
+@st.cache_data(show_spinner=False)
+def get_download_xlsx_bytes_cached(path: str, mtime: float) -> bytes:
+    return get_download_xlsx_bytes(path)
+
+
 # -------------------------------
 # Streamlit UI
 # -------------------------------
@@ -180,8 +270,9 @@ st.set_page_config(page_title=APP_TITLE, layout="wide")
 st.title(APP_TITLE)
 
 # 세션 상태 초기화
+# 모델명 → 수량. 이름 키 dict라 '선택 삭제'가 del 한 번으로 끝난다
 if "others" not in st.session_state:
-    st.session_state.others = []
+    st.session_state.others = {}
 if "edit_id" not in st.session_state:
     st.session_state.edit_id = None
 
@@ -237,7 +328,7 @@ with left:
     with oc3:
         if st.button("추가"):
             if other_name and other_qty > 0:
-                st.session_state.others.append((other_name, int(other_qty)))
+                st.session_state.others[other_name] = int(other_qty)
                 st.session_state.other_name = ""
                 st.session_state.other_qty = 0
             else:
@@ -245,18 +336,18 @@ with left:
 
     if st.session_state.others:
         st.write("**기타 목록**")
-        df_others = pd.DataFrame(st.session_state.others, columns=["모델","수량"])
+        df_others = pd.DataFrame(st.session_state.others.items(), columns=["모델","수량"])
         st.dataframe(df_others, use_container_width=True, hide_index=True)
-        remove_idx = st.selectbox(
+        remove_pick = st.selectbox(
             "삭제할 항목 선택",
-            options=[("선택하세요", None)] + [(f"{n} x {q}", i) for i, (n,q) in enumerate(st.session_state.others)],
+            options=[("선택하세요", None)] + [(f"{n} x {q}", n) for n, q in st.session_state.others.items()],
             format_func=lambda x: x[0],
             index=0
         )
         cdel1, cdel2 = st.columns([1,3])
         if cdel1.button("선택 삭제"):
-            if remove_idx[1] is not None:
-                st.session_state.others.pop(remove_idx[1])
+            if remove_pick[1] is not None:
+                st.session_state.others.pop(remove_pick[1], None)
             else:
                 st.warning("삭제할 항목을 선택하세요.")
         if cdel2.button("모두 초기화"):
@@ -270,7 +361,8 @@ with left:
             st.error("현장명을 입력하세요.")
         else:
             rec = {
-                "ID": f"SR-{datetime.now():%Y%m%d%H%M%S}",
+                # "ID"가 PRIMARY KEY — 같은 초에 두 번 저장해도 충돌하지 않게 uuid 꼬리표
+                "ID": f"SR-{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:6]}",
                 "날짜": d_date.strftime("%Y-%m-%d"),
                 "영업자": sales.strip() or "김범준",
                 "현장명": site.strip(),
@@ -286,7 +378,6 @@ with left:
                 rec[f"모델_{m}"] = int(q or 0)
             for a, q in accessory_counts.items():
                 rec[f"자재_{a}"] = int(q or 0)
-            ensure_workbook(DEFAULT_EXCEL_PATH)
             append_record(rec, DEFAULT_EXCEL_PATH)
             st.success("신규 저장 완료!")
 
@@ -341,65 +432,75 @@ with right:
     st.markdown("---")
     st.subheader("저장 목록")
 
-    df = load_all(DEFAULT_EXCEL_PATH)
-    if not df.empty:
-        df_show = df.copy()
-        if "ID" in df_show.columns:
-            df_show = df_show.drop(columns=["ID"])
-        st.dataframe(df_show, use_container_width=True, hide_index=True)
-
-        options = [("— 행 선택 —", None)] + [
-            (f"{r['날짜']} | {r['현장명']} | {r.get('담당자','')}", str(r["ID"])) for _, r in df.iterrows()
-        ]
-        picked = st.selectbox("행 선택 (불러오기/삭제 대상)", options=options, format_func=lambda x: x[0], index=0)
-        picked_id = picked[1]
-
-        c1, c2, c3 = st.columns([1,1,2])
-        if c1.button("불러오기"):
-            if not picked_id:
-                st.warning("먼저 행을 선택하세요.")
-            else:
-                row = df[df["ID"].astype(str) == str(picked_id)].iloc[0]
-                st.session_state.edit_id = str(picked_id)
-                try:
-                    st.session_state.date = date.fromisoformat(str(row.get("날짜","")))
-                except Exception:
-                    st.session_state.date = date.today()
-                st.session_state.sales = str(row.get("영업자","") or "")
-                st.session_state.site = str(row.get("현장명","") or "")
-                st.session_state.person = str(row.get("담당자","") or "")
-                st.session_state.phone = str(row.get("연락처","") or "")
-                st.session_state.status = str(row.get("진행상태","진행중") or "진행중")
-                st.session_state.reason = str(row.get("불가사유","") or "")
-                st.session_state.memo = str(row.get("비고","") or "")
-                for m in BUILTIN_MODELS:
-                    st.session_state[f"m_{m}"] = int(row.get(f"모델_{m}", 0) or 0)
-                for a in ACCESSORY_ITEMS:
-                    st.session_state[f"a_{a}"] = int(row.get(f"자재_{a}", 0) or 0)
-                try:
-                    st.session_state.others = json.loads(row.get("기타(JSON)","[]")) or []
-                except Exception:
-                    st.session_state.others = []
-                st.info("좌측 폼에 값이 반영되었습니다. 수정 후 '선택 수정'으로 저장하세요.")
-                st.rerun()
-
-        if c2.button("삭제"):
-            if not picked_id:
-                st.warning("삭제할 행을 선택하세요.")
-            else:
-                n = delete_records([picked_id], DEFAULT_EXCEL_PATH)
-                if n > 0:
-                    st.success("삭제 완료")
+    # 목록을 펼친 경우에만 저장소를 읽는다 — 좌측 입력 중의 재실행은 DB를 건드리지 않음
+    if st.toggle("목록 보기", key="show_list"):
+        df = load_all_cached(DEFAULT_EXCEL_PATH, _store_mtime())
+        if not df.empty:
+            df_show = df.copy()
+            if "ID" in df_show.columns:
+                df_show = df_show.drop(columns=["ID"])
+            st.dataframe(df_show, use_container_width=True, hide_index=True)
+
+            # ID 문자열 변환과 id→행 위치 인덱스는 렌더당 1회만
+            ids = df["ID"].astype(str)
+            id_to_idx = {rid: i for i, rid in enumerate(ids)}
+            options = [("— 행 선택 —", None)] + [
+                (f"{d} | {s} | {p}", rid)
+                for d, s, p, rid in zip(df["날짜"], df["현장명"], df["담당자"], ids)
+            ]
+            picked = st.selectbox("행 선택 (불러오기/삭제 대상)", options=options, format_func=lambda x: x[0], index=0)
+            picked_id = picked[1]
+
+            c1, c2, c3 = st.columns([1,1,2])
+            if c1.button("불러오기"):
+                if not picked_id:
+                    st.warning("먼저 행을 선택하세요.")
+                else:
+                    # Series 인덱싱 대신 평범한 dict로 한 번에 변환 후 접근
+                    row = df.iloc[id_to_idx[str(picked_id)]].to_dict()
+                    st.session_state.edit_id = str(picked_id)
+                    try:
+                        st.session_state.date = date.fromisoformat(str(row.get("날짜","")))
+                    except Exception:
+                        st.session_state.date = date.today()
+                    st.session_state.sales = str(row.get("영업자","") or "")
+                    st.session_state.site = str(row.get("현장명","") or "")
+                    st.session_state.person = str(row.get("담당자","") or "")
+                    st.session_state.phone = str(row.get("연락처","") or "")
+                    st.session_state.status = str(row.get("진행상태","진행중") or "진행중")
+                    st.session_state.reason = str(row.get("불가사유","") or "")
+                    st.session_state.memo = str(row.get("비고","") or "")
+                    for m in BUILTIN_MODELS:
+                        st.session_state[f"m_{m}"] = int(row.get(f"모델_{m}", 0) or 0)
+                    for a in ACCESSORY_ITEMS:
+                        st.session_state[f"a_{a}"] = int(row.get(f"자재_{a}", 0) or 0)
+                    try:
+                        loaded = json.loads(row.get("기타(JSON)","{}") or "{}")
+                        # 과거 저장본은 [이름, 수량] 쌍의 리스트 — dict()로 그대로 수용
+                        st.session_state.others = dict(loaded) if loaded else {}
+                    except Exception:
+                        st.session_state.others = {}
+                    st.info("좌측 폼에 값이 반영되었습니다. 수정 후 '선택 수정'으로 저장하세요.")
                     st.rerun()
+
+            if c2.button("삭제"):
+                if not picked_id:
+                    st.warning("삭제할 행을 선택하세요.")
                 else:
-                    st.error("삭제 실패")
+                    n = delete_records([picked_id], DEFAULT_EXCEL_PATH)
+                    if n > 0:
+                        st.success("삭제 완료")
+                        st.rerun()
+                    else:
+                        st.error("삭제 실패")
 
-    else:
-        st.info("저장된 항목이 없습니다. 좌측에서 입력 후 저장하세요.")
+        else:
+            st.info("저장된 항목이 없습니다. 좌측에서 입력 후 저장하세요.")
 
     st.download_button(
         "엑셀 내려받기",
-        data=get_download_xlsx_bytes(DEFAULT_EXCEL_PATH),
+        # 콜러블을 넘기면 클릭 시점에만 직렬화된다 (재실행마다 엑셀 생성 금지)
+        data=lambda: get_download_xlsx_bytes_cached(DEFAULT_EXCEL_PATH, _store_mtime()),
         file_name="영업보고서.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         help="백업용으로 다운로드하세요(스트림릿 클라우드는 파일시스템이 초기화될 수 있음)."